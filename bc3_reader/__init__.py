@@ -2,7 +2,7 @@
 """BC3 Reader - Lector y exportador de archivos FIEBDC BC3."""
 
 from .parser import BC3Parser, PresupuestoBC3
-from .exporters import export_to_xlsx, export_to_pdf, export_to_xlsx_bytes, export_to_pdf_bytes
+from . import exporters
 
 __version__ = '1.0.0'
 __all__ = [
@@ -10,3 +10,14 @@ __all__ = [
     'export_to_xlsx', 'export_to_pdf',
     'export_to_xlsx_bytes', 'export_to_pdf_bytes'
 ]
+
+
+def __getattr__(name):
+    # Exportadores diferidos: se cargan al usarse (ver bc3_reader.exporters)
+    if name in exporters.__all__:
+        return getattr(exporters, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
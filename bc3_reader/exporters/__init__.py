@@ -1,7 +1,51 @@
 # -*- coding: utf-8 -*-
-"""Exportadores de presupuestos BC3."""
+"""
+Exportadores de presupuestos BC3.
 
-from .xlsx_exporter import export_to_xlsx, export_to_xlsx_bytes
-from .pdf_exporter import export_to_pdf, export_to_pdf_bytes
+Cada exportador se importa al pedir su función (PEP 562): xlsxwriter y fpdf2
+solo se cargan cuando se exporta a ese formato.
+"""
+
+import importlib
+from operator import itemgetter
+from typing import Iterator
+
+# Función exportada -> submódulo que la define
+_EXPORTS = {
+    'export_to_xlsx': 'xlsx_exporter',
+    'export_to_xlsx_bytes': 'xlsx_exporter',
+    'export_to_pdf': 'pdf_exporter',
+    'export_to_pdf_bytes': 'pdf_exporter',
+}
 
 __all__ = ['export_to_xlsx', 'export_to_pdf', 'export_to_xlsx_bytes', 'export_to_pdf_bytes']
+
+
+def _valores(partidas, claves) -> Iterator[tuple]:
+    """
+    Tuplas con los valores de cada partida en el orden de `claves`, una a una
+    (admite un iterador de partidas sin materializar la tabla).
+
+    itemgetter extrae todos los campos en una sola llamada en C; si alguna
+    partida no trae todas las claves (las del parser siempre las traen), se
+    rellenan con ''.
+    """
+    get = itemgetter(*claves)
+    for partida in partidas:
+        try:
+            yield get(partida)
+        except KeyError:
+            yield tuple(partida.get(clave, '') for clave in claves)
+
+
+def __getattr__(name):
+    modulo = _EXPORTS.get(name)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    valor = getattr(importlib.import_module(f'.{modulo}', __name__), name)
+    globals()[name] = valor  # las siguientes búsquedas no pasan por aquí
+    return valor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
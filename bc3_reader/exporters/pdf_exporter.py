@@ -2,75 +2,104 @@
 """Exportador de presupuestos BC3 a PDF."""
 
 import io
+import os
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict
 
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
 
+from . import _valores
 
-def export_to_pdf(partidas: List[Dict], output_path: str, titulo: str = "Presupuesto BC3") -> str:
+# Motor de PDF: fpdf2 (por defecto) o 'reportlab' (Platypus, versión anterior)
+PDF_BACKEND = os.environ.get('BC3_PDF_BACKEND', 'fpdf2')
+
+# Columnas de la tabla: (cabecera, clave de partida, ancho en mm, alineación, máx. caracteres)
+COLUMNAS = (
+    ('Código', 'codigo', 30, 'L', 20),
+    ('Descripción', 'descripcion', 80, 'L', 60),
+    ('Ud', 'unidad', 15, 'L', None),
+    ('Cantidad', 'cantidad', 20, 'R', None),
+    ('Precio Unit.', 'precio_unitario', 25, 'R', None),
+    ('Importe', 'importe', 25, 'R', None),
+)
+CLAVES = tuple(clave for _, clave, _, _, _ in COLUMNAS)
+ALTO_CABECERA = 8  # mm
+ALTO_FILA = 5  # mm
+
+
+def _fit(valor, maximo=None) -> str:
+    """Texto de la celda recortado a `maximo` caracteres; sin str() si ya es texto."""
+    s = valor if type(valor) is str else str(valor)
+    return s if maximo is None or len(s) <= maximo else s[:maximo]
+
+
+def _texto(valor) -> str:
+    """Texto apto para las fuentes estándar del PDF (cp1252: incluye €)."""
+    s = _fit(valor)
+    if s.isascii():
+        return s
+    return s.encode('cp1252', 'replace').decode('cp1252')
+
+
+class _PresupuestoPDF(FPDF):
+    """A4 con título en la primera página y cabecera de tabla repetida en cada página."""
+
+    def __init__(self, titulo: str):
+        super().__init__(orientation='P', unit='mm', format='A4')
+        self.titulo = _texto(titulo)
+        self.core_fonts_encoding = 'windows-1252'
+        # Tabla de 195 mm centrada en A4
+        self.set_margins(7.5, 15, 7.5)
+        self.set_auto_page_break(auto=True, margin=15)
+        self.set_draw_color(128, 128, 128)
+        self.set_line_width(0.18)
+
+    def header(self):
+        if self.page_no() == 1:
+            self.set_font('Helvetica', 'B', 16)
+            self.set_text_color(0, 0, 0)
+            # multi_cell parte los títulos largos en varias líneas, como el Paragraph anterior
+            self.multi_cell(0, 10, self.titulo, align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            self.ln(8)
+        self.set_font('Helvetica', 'B', 10)
+        self.set_fill_color(68, 114, 196)
+        self.set_text_color(245, 245, 245)
+        for cabecera, _, ancho, alineacion, _ in COLUMNAS:
+            self.cell(ancho, ALTO_CABECERA, cabecera, border=1, align=alineacion, fill=True)
+        self.ln()
+        self.set_font('Helvetica', '', 8)
+        self.set_text_color(0, 0, 0)
+
+
+def _export_fpdf2(partidas: List[Dict], titulo: str) -> bytes:
+    """Genera el PDF con fpdf2: una pasada, paginación automática sin Platypus."""
+    pdf = _PresupuestoPDF(titulo)
+    pdf.add_page()
+    for valores in _valores(partidas, CLAVES):
+        for valor, (_, _, ancho, alineacion, maximo) in zip(valores, COLUMNAS):
+            pdf.cell(ancho, ALTO_FILA, _texto(_fit(valor, maximo)), border=1, align=alineacion)
+        pdf.ln()
+    return bytes(pdf.output())
+
+
+@lru_cache(maxsize=None)
+def _reportlab_estilos():
     """
-    Exporta las partidas del presupuesto a un archivo PDF.
-    
-    Args:
-        partidas: Lista de diccionarios con los datos de cada partida
-        output_path: Ruta del archivo de salida .pdf
-        titulo: Título del documento
-        
+    Estilos de ReportLab construidos una sola vez (el motor se importa al usarse).
+
     Returns:
-        Ruta del archivo generado
+        Tupla (estilo del título, TableStyle, anchos de columna)
     """
-    output_path = Path(output_path)
-    if output_path.suffix.lower() != '.pdf':
-        output_path = output_path.with_suffix('.pdf')
-    
-    doc = SimpleDocTemplate(
-        str(output_path),
-        pagesize=A4,
-        rightMargin=1.5*cm,
-        leftMargin=1.5*cm,
-        topMargin=1.5*cm,
-        bottomMargin=1.5*cm
-    )
-    
-    elements = []
-    
-    # Título
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import TableStyle
+
     styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=20,
-        alignment=1  # Center
-    )
-    elements.append(Paragraph(titulo, title_style))
-    elements.append(Spacer(1, 0.5*cm))
-    
-    # Tabla principal (sin descripción larga para evitar páginas gigantes)
-    # Usamos columnas: Código, Descripción, Ud, Cantidad, Precio, Importe
-    data = [['Código', 'Descripción', 'Ud', 'Cantidad', 'Precio Unit.', 'Importe']]
-    
-    for partida in partidas:
-        row = [
-            str(partida.get('codigo', ''))[:20],
-            str(partida.get('descripcion', ''))[:60],
-            str(partida.get('unidad', '')),
-            str(partida.get('cantidad', '')),
-            str(partida.get('precio_unitario', '')),
-            str(partida.get('importe', ''))
-        ]
-        data.append(row)
-    
-    # Crear tabla con ancho fijo para caber en A4
-    col_widths = [3*cm, 8*cm, 1.5*cm, 2*cm, 2.5*cm, 2.5*cm]
-    table = Table(data, colWidths=col_widths, repeatRows=1)
-    
-    table.setStyle(TableStyle([
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=16, spaceAfter=20, alignment=1)
+    table_style = TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
@@ -84,16 +113,18 @@ def export_to_pdf(partidas: List[Dict], output_path: str, titulo: str = "Presupu
         ('FONTSIZE', (0, 1), (-1, -1), 8),
         ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    
-    elements.append(table)
-    doc.build(elements)
-    
-    return str(output_path)
+    ])
+    col_widths = tuple(ancho / 10 * cm for _, _, ancho, _, _ in COLUMNAS)  # mm -> cm
+    return title_style, table_style, col_widths
 
 
-def export_to_pdf_bytes(partidas: List[Dict], titulo: str = "Presupuesto BC3") -> bytes:
-    """Exporta a PDF y retorna los bytes (para respuestas HTTP)."""
+def _export_reportlab(partidas: List[Dict], titulo: str) -> bytes:
+    """Genera el PDF con ReportLab (SimpleDocTemplate + Table), motor anterior."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+
+    title_style, table_style, col_widths = _reportlab_estilos()
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(
         buffer,
@@ -101,40 +132,42 @@ def export_to_pdf_bytes(partidas: List[Dict], titulo: str = "Presupuesto BC3") -
         rightMargin=1.5*cm, leftMargin=1.5*cm,
         topMargin=1.5*cm, bottomMargin=1.5*cm
     )
-    elements = []
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=16, spaceAfter=20, alignment=1)
-    elements.append(Paragraph(titulo, title_style))
-    elements.append(Spacer(1, 0.5*cm))
-    
-    data = [['Código', 'Descripción', 'Ud', 'Cantidad', 'Precio Unit.', 'Importe']]
-    for partida in partidas:
-        data.append([
-            str(partida.get('codigo', ''))[:20],
-            str(partida.get('descripcion', ''))[:60],
-            str(partida.get('unidad', '')),
-            str(partida.get('cantidad', '')),
-            str(partida.get('precio_unitario', '')),
-            str(partida.get('importe', ''))
-        ])
-    
-    col_widths = [3*cm, 8*cm, 1.5*cm, 2*cm, 2.5*cm, 2.5*cm]
+    elements = [Paragraph(titulo, title_style), Spacer(1, 0.5*cm)]
+
+    maximos = tuple(maximo for _, _, _, _, maximo in COLUMNAS)
+    data = [[cabecera for cabecera, _, _, _, _ in COLUMNAS]]
+    data += [[_fit(valor, maximo) for valor, maximo in zip(valores, maximos)]
+             for valores in _valores(partidas, CLAVES)]
+
     table = Table(data, colWidths=col_widths, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (3, 0), (5, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('TOPPADDING', (0, 0), (-1, 0), 8),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
+    table.setStyle(table_style)
     elements.append(table)
     doc.build(elements)
     return buffer.getvalue()
+
+
+def export_to_pdf(partidas: List[Dict], output_path: str, titulo: str = "Presupuesto BC3") -> str:
+    """
+    Exporta las partidas del presupuesto a un archivo PDF.
+
+    Args:
+        partidas: Lista de diccionarios con los datos de cada partida
+        output_path: Ruta del archivo de salida .pdf
+        titulo: Título del documento
+
+    Returns:
+        Ruta del archivo generado
+    """
+    output_path = Path(output_path)
+    if output_path.suffix.lower() != '.pdf':
+        output_path = output_path.with_suffix('.pdf')
+
+    output_path.write_bytes(export_to_pdf_bytes(partidas, titulo))
+    return str(output_path)
+
+
+def export_to_pdf_bytes(partidas: List[Dict], titulo: str = "Presupuesto BC3") -> bytes:
+    """Exporta a PDF y retorna los bytes (para respuestas HTTP)."""
+    if PDF_BACKEND == 'reportlab':
+        return _export_reportlab(partidas, titulo)
+    return _export_fpdf2(partidas, titulo)
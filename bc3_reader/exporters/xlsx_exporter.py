@@ -2,130 +2,150 @@
 """Exportador de presupuestos BC3 a Excel (XLSX)."""
 
 import io
+import os
+from copy import copy
 from pathlib import Path
-from typing import List, Dict, Union
+from typing import List, Dict
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
+import xlsxwriter
 
+from . import _valores
 
-def export_to_xlsx(partidas: List[Dict], output_path: str, titulo: str = "Presupuesto BC3") -> str:
+# Motor de XLSX: xlsxwriter (por defecto) u 'openpyxl' (write-only, versión anterior)
+XLSX_BACKEND = os.environ.get('BC3_XLSX_BACKEND', 'xlsxwriter')
+
+HEADERS = ['Código', 'Descripción', 'Unidad', 'Cantidad', 'Precio Unit.', 'Importe', 'Texto', 'Descomposición']
+COLUMN_WIDTHS = [15, 40, 10, 12, 15, 15, 50, 40]
+CAMPOS = ('codigo', 'descripcion', 'unidad', 'cantidad', 'precio_unitario',
+          'importe', 'texto_largo', 'descomposicion')
+
+
+def _escribir_xlsxwriter(destino, partidas: List[Dict], titulo: str) -> None:
     """
-    Exporta las partidas del presupuesto a un archivo Excel.
-    
+    Escribe el libro con xlsxwriter en modo constant_memory: cada fila se
+    vuelca a un temporal al pasar a la siguiente y los formatos se registran
+    una sola vez.
+
     Args:
-        partidas: Lista de diccionarios con los datos de cada partida
-        output_path: Ruta del archivo de salida .xlsx
-        titulo: Título del documento
-        
-    Returns:
-        Ruta del archivo generado
+        destino: Ruta o archivo binario de salida
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Presupuesto"
-    
+    wb = xlsxwriter.Workbook(destino, {'constant_memory': True, 'strings_to_urls': False})
+    ws = wb.add_worksheet("Presupuesto")
+
+    # Estilos
+    title_format = wb.add_format({'bold': True, 'font_size': 14, 'align': 'center'})
+    header_format = wb.add_format({
+        'bold': True, 'font_size': 11, 'font_color': '#FFFFFF',
+        'bg_color': '#4472C4', 'pattern': 1,
+        'align': 'center', 'text_wrap': True, 'border': 1,
+    })
+    data_format = wb.add_format({'border': 1, 'text_wrap': True, 'valign': 'top'})
+
+    for i, width in enumerate(COLUMN_WIDTHS):
+        ws.set_column(i, i, width)
+
+    # En constant_memory las filas se escriben en orden: título, vacía, encabezados, datos
+    ws.set_row(0, 25)
+    ws.merge_range(0, 0, 0, len(HEADERS) - 1, titulo, title_format)
+    ws.write_row(2, 0, HEADERS, header_format)
+    for fila, valores in enumerate(_valores(partidas, CAMPOS), 3):
+        ws.write_row(fila, 0, valores, data_format)
+
+    wb.close()
+
+
+def _crear_libro(partidas: List[Dict], titulo: str):
+    """
+    Construye el libro con openpyxl en modo write-only: las filas se vuelcan
+    al guardar sin retener un objeto Cell por celda (memoria O(1) por fila).
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Presupuesto")
+
     # Estilos
-    header_font = Font(bold=True, size=11)
     header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
     header_font_white = Font(bold=True, size=11, color="FFFFFF")
     thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+        left=Side(style='thin'), right=Side(style='thin'),
+        top=Side(style='thin'), bottom=Side(style='thin')
     )
-    
-    # Título
-    ws.merge_cells('A1:H1')
-    ws['A1'] = titulo
-    ws['A1'].font = Font(bold=True, size=14)
-    ws['A1'].alignment = Alignment(horizontal='center')
+
+    # En write-only, anchos, alturas y combinaciones se declaran antes de escribir
+    for i, width in enumerate(COLUMN_WIDTHS, 1):
+        ws.column_dimensions[get_column_letter(i)].width = width
     ws.row_dimensions[1].height = 25
-    
+    ws.merged_cells.add('A1:H1')
+
+    # Título
+    title_cell = WriteOnlyCell(ws, value=titulo)
+    title_cell.font = Font(bold=True, size=14)
+    title_cell.alignment = Alignment(horizontal='center')
+    ws.append([title_cell])
+    ws.append([])
+
     # Encabezados
-    headers = ['Código', 'Descripción', 'Unidad', 'Cantidad', 'Precio Unit.', 'Importe', 'Texto', 'Descomposición']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=3, column=col, value=header)
+    header_row = []
+    for header in HEADERS:
+        cell = WriteOnlyCell(ws, value=header)
         cell.font = header_font_white
         cell.fill = header_fill
         cell.alignment = Alignment(horizontal='center', wrap_text=True)
         cell.border = thin_border
-    
-    # Datos
-    for row_idx, partida in enumerate(partidas, start=4):
-        ws.cell(row=row_idx, column=1, value=partida.get('codigo', ''))
-        ws.cell(row=row_idx, column=2, value=partida.get('descripcion', ''))
-        ws.cell(row=row_idx, column=3, value=partida.get('unidad', ''))
-        ws.cell(row=row_idx, column=4, value=partida.get('cantidad', ''))
-        ws.cell(row=row_idx, column=5, value=partida.get('precio_unitario', ''))
-        ws.cell(row=row_idx, column=6, value=partida.get('importe', ''))
-        ws.cell(row=row_idx, column=7, value=partida.get('texto_largo', ''))
-        ws.cell(row=row_idx, column=8, value=partida.get('descomposicion', ''))
-        
-        for col in range(1, 9):
-            ws.cell(row=row_idx, column=col).border = thin_border
-            ws.cell(row=row_idx, column=col).alignment = Alignment(wrap_text=True, vertical='top')
-    
-    # Ajustar anchos de columna
-    column_widths = [15, 40, 10, 12, 15, 15, 50, 40]
-    for i, width in enumerate(column_widths, 1):
-        ws.column_dimensions[get_column_letter(i)].width = width
-    
-    # Guardar
+        header_row.append(cell)
+    ws.append(header_row)
+
+    # Datos: el estilo (borde + alineación) se registra una sola vez en una celda
+    # plantilla; cada celda copia su StyleArray en vez de resolver los estilos
+    data_template = WriteOnlyCell(ws)
+    data_template.border = thin_border
+    data_template.alignment = Alignment(wrap_text=True, vertical='top')
+    data_style = data_template._style
+    for valores in _valores(partidas, CAMPOS):
+        row = []
+        for valor in valores:
+            cell = WriteOnlyCell(ws, value=valor)
+            cell._style = copy(data_style)
+            row.append(cell)
+        ws.append(row)
+
+    return wb
+
+
+def _escribir(destino, partidas: List[Dict], titulo: str) -> None:
+    """Escribe el libro en `destino` (ruta o archivo) con el motor configurado."""
+    if XLSX_BACKEND == 'openpyxl':
+        _crear_libro(partidas, titulo).save(destino)
+    else:
+        _escribir_xlsxwriter(destino, partidas, titulo)
+
+
+def export_to_xlsx(partidas: List[Dict], output_path: str, titulo: str = "Presupuesto BC3") -> str:
+    """
+    Exporta las partidas del presupuesto a un archivo Excel.
+
+    Args:
+        partidas: Lista de diccionarios con los datos de cada partida
+        output_path: Ruta del archivo de salida .xlsx
+        titulo: Título del documento
+
+    Returns:
+        Ruta del archivo generado
+    """
     output_path = Path(output_path)
     if output_path.suffix.lower() != '.xlsx':
         output_path = output_path.with_suffix('.xlsx')
-    
-    wb.save(str(output_path))
+
+    _escribir(str(output_path), partidas, titulo)
     return str(output_path)
 
 
 def export_to_xlsx_bytes(partidas: List[Dict], titulo: str = "Presupuesto BC3") -> bytes:
     """Exporta a Excel y retorna los bytes (para respuestas HTTP)."""
     buffer = io.BytesIO()
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Presupuesto"
-    
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font_white = Font(bold=True, size=11, color="FFFFFF")
-    thin_border = Border(
-        left=Side(style='thin'), right=Side(style='thin'),
-        top=Side(style='thin'), bottom=Side(style='thin')
-    )
-    
-    ws.merge_cells('A1:H1')
-    ws['A1'] = titulo
-    ws['A1'].font = Font(bold=True, size=14)
-    ws['A1'].alignment = Alignment(horizontal='center')
-    ws.row_dimensions[1].height = 25
-    
-    headers = ['Código', 'Descripción', 'Unidad', 'Cantidad', 'Precio Unit.', 'Importe', 'Texto', 'Descomposición']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=3, column=col, value=header)
-        cell.font = header_font_white
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center', wrap_text=True)
-        cell.border = thin_border
-    
-    for row_idx, partida in enumerate(partidas, start=4):
-        ws.cell(row=row_idx, column=1, value=partida.get('codigo', ''))
-        ws.cell(row=row_idx, column=2, value=partida.get('descripcion', ''))
-        ws.cell(row=row_idx, column=3, value=partida.get('unidad', ''))
-        ws.cell(row=row_idx, column=4, value=partida.get('cantidad', ''))
-        ws.cell(row=row_idx, column=5, value=partida.get('precio_unitario', ''))
-        ws.cell(row=row_idx, column=6, value=partida.get('importe', ''))
-        ws.cell(row=row_idx, column=7, value=partida.get('texto_largo', ''))
-        ws.cell(row=row_idx, column=8, value=partida.get('descomposicion', ''))
-        for col in range(1, 9):
-            ws.cell(row=row_idx, column=col).border = thin_border
-            ws.cell(row=row_idx, column=col).alignment = Alignment(wrap_text=True, vertical='top')
-    
-    column_widths = [15, 40, 10, 12, 15, 15, 50, 40]
-    for i, width in enumerate(column_widths, 1):
-        ws.column_dimensions[get_column_letter(i)].width = width
-    
-    wb.save(buffer)
+    _escribir(buffer, partidas, titulo)
     return buffer.getvalue()
@@ -11,26 +11,90 @@ Estructura según especificación FIEBDC-3:
 - Subcampos separados por \ (ASCII-92)
 """
 
+import codecs
 import re
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from functools import lru_cache, partial
+from itertools import repeat
+from types import MappingProxyType
+from typing import Any, BinaryIO, Dict, Iterator, List, Mapping, Optional
+
+# Separadores de niveles en los códigos (01.1.001, 01#)
+_CODIGO_SPLIT_RE = re.compile(r"[.#]")
+
+# Parseo en varios procesos (opt-in): por debajo de este número de registros
+# el coste de repartirlos y recoger los resultados supera a la ganancia
+PARALELO_MIN_REGISTROS = 50000
+_pools = {}  # número de procesos -> ProcessPoolExecutor compartido
+_pools_lock = threading.Lock()
 
 
 def _primer_subcampo(valor: str) -> str:
     """Extrae el primer subcampo de un campo (separador \). FIEBDC-3."""
-    if not valor or not str(valor).strip():
+    if not valor:
         return ''
-    partes = str(valor).strip().split('\\')
-    return partes[0].strip() if partes else ''
+    # partition corta en el primer separador sin crear la lista de subcampos
+    return str(valor).partition('\\')[0].strip()
 
 
 def _todos_subcampos(valor: str) -> List[str]:
     """Extrae todos los subcampos de un campo (separador \)."""
-    if not valor or not str(valor).strip():
+    if not valor:
         return []
-    return [p.strip() for p in str(valor).strip().split('\\') if p.strip()]
+    return [p.strip() for p in str(valor).split('\\') if p and not p.isspace()]
 
 
+def _strip_todos(campos: List[str]) -> List[str]:
+    """Campos sin espacios en los extremos (registros que se guardan tal cual)."""
+    return [c.strip() for c in campos]
+
+
+def _orden_codigo(c: str) -> tuple:
+    """Ordenación jerárquica de códigos (##, #, 01.1.001)."""
+    base = str(c).replace("##", "").replace("#", "")
+    result = []
+    for p in _CODIGO_SPLIT_RE.split(base)[:8]:
+        if p.isdigit():
+            result.append(int(p))
+        else:
+            result.append(p or "0")
+    return tuple(result)
+
+
+def _con_slots(cls):
+    """
+    Recrea una dataclass con __slots__ (sin __dict__ por instancia), como
+    dataclass(slots=True) de Python 3.10+, compatible con Python 3.8.
+    """
+    nombres = tuple(f.name for f in fields(cls))
+    atributos = dict(cls.__dict__)
+    for nombre in nombres + ("__dict__", "__weakref__"):
+        atributos.pop(nombre, None)
+    atributos["__slots__"] = nombres
+    return type(cls)(cls.__name__, cls.__bases__, atributos)
+
+
+@lru_cache(maxsize=8192)
+def _parse_numero(s: str) -> Optional[float]:
+    """
+    Parsea número español (coma decimal) o inglés según FIEBDC-3.
+
+    Cacheado: los BC3 repiten mucho los mismos valores ("1", "1,00", "0,00").
+    """
+    if not s:
+        return None
+    # float() ya ignora los espacios en blanco de los extremos (y "" falla)
+    try:
+        return float(str(s).replace(" ", "").replace(".", "").replace(",", "."))
+    except ValueError:
+        return None
+
+
+@_con_slots
 @dataclass
 class Concepto:
     """Representa un concepto según registro ~C FIEBDC-3."""
@@ -44,13 +108,20 @@ class Concepto:
     raw_fields: List[str] = field(default_factory=list)
 
 
+@_con_slots
 @dataclass
 class PresupuestoBC3:
     """Objeto que contiene todo el presupuesto parseado según FIEBDC-3."""
 
     version: Dict[str, str] = field(default_factory=dict)
     coeficientes: Dict[str, Any] = field(default_factory=dict)  # Registro ~K
-    conceptos: Dict[str, List[str]] = field(default_factory=dict)
+    # Conceptos (~C) por columnas: código -> posición en las listas paralelas
+    indice_conceptos: Dict[str, int] = field(default_factory=dict)
+    unidades: List[str] = field(default_factory=list)
+    resumenes: List[str] = field(default_factory=list)
+    precios: List[str] = field(default_factory=list)
+    fechas: List[str] = field(default_factory=list)
+    tipos: List[str] = field(default_factory=list)
     descomposiciones: Dict[str, List[str]] = field(default_factory=dict)
     mediciones: Dict[str, List[str]] = field(default_factory=dict)
     textos: Dict[str, str] = field(default_factory=dict)
@@ -58,24 +129,75 @@ class PresupuestoBC3:
     # Registros adicionales para compatibilidad
     otros_registros: Dict[str, List[List[str]]] = field(default_factory=dict)
 
+    @property
+    def conceptos(self) -> Mapping[str, List[str]]:
+        """
+        Vista de compatibilidad de solo lectura: código -> [unidad, resumen,
+        precio, fecha, tipo].
+
+        Se construye en cada acceso (O(N)) a partir de las listas paralelas:
+        guardarla en una variable antes de recorrerla o consultarla en bucle.
+        Asignar claves lanza TypeError; para consultas sueltas basta
+        `codigo in presupuesto.indice_conceptos`.
+        """
+        columnas = zip(self.unidades, self.resumenes, self.precios, self.fechas, self.tipos)
+        return MappingProxyType(
+            {codigo: list(campos) for codigo, campos in zip(self.indice_conceptos, columnas)}
+        )
+
 
 class BC3Parser:
-    """Parser para archivos BC3 conforme a especificación FIEBDC-3/2020."""
+    """
+    Parser para archivos BC3 conforme a especificación FIEBDC-3/2020.
+
+    No guarda estado por parseo (cada llamada crea su PresupuestoBC3), así que
+    una misma instancia puede reutilizarse y compartirse entre hilos.
+    """
 
-    def __init__(self, encoding: str = "latin-1"):
+    # Tamaño de bloque al parsear desde stream
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self, encoding: str = "latin-1", timeout: Optional[float] = None, procesos: int = 1
+    ):
         """
         Args:
             encoding: Codificación por defecto (latin-1 para BC3 clásicos, utf-8 para UTF-8).
+            timeout: Segundos máximos por parseo (None = sin límite). Si se superan
+                se lanza TimeoutError.
+            procesos: Con más de 1, los BC3 de al menos PARALELO_MIN_REGISTROS
+                registros se parsean repartidos en ese número de procesos (el
+                archivo se carga completo en memoria en vez de leerse por bloques).
         """
         self.encoding = encoding
+        self.timeout = timeout
+        self.procesos = procesos
+        # Tipo de registro -> manejador(campos, presupuesto); los tipos no
+        # listados se ignoran
+        self._dispatch = {
+            "V": self._parse_registro_v,
+            "K": self._parse_registro_k,
+            "C": self._parse_registro_c,
+            "D": self._parse_registro_d,
+            "Y": self._parse_registro_y,
+            "M": self._parse_registro_m,
+            "T": self._parse_registro_t,
+        }
+        for tipo in ("R", "F", "G", "L", "O", "X", "Z"):
+            self._dispatch[tipo] = partial(self._guardar_otro, tipo)
+
+    def _decodificar(self, raw_bytes: bytes):
+        """
+        Detecta la codificación (UTF-8 si es válido, si no latin-1) y decodifica
+        en la misma pasada.
 
-    def _detect_encoding(self, raw_bytes: bytes) -> str:
-        """Detecta codificación según especificación (850, 437, ANSI)."""
+        Returns:
+            Tupla (codificación, texto)
+        """
         try:
-            raw_bytes.decode("utf-8")
-            return "utf-8"
+            return "utf-8", raw_bytes.decode("utf-8")
         except UnicodeDecodeError:
-            return "latin-1"
+            return "latin-1", raw_bytes.decode("latin-1")
 
     def parse_from_bytes(
         self, raw: bytes, filename: str = ""
@@ -90,14 +212,23 @@ class BC3Parser:
         Returns:
             PresupuestoBC3 con todos los datos parseados
         """
-        encoding = self._detect_encoding(raw)
-        contenido = raw.decode(encoding, errors="replace")
+        return self._parse_content_bytes(raw, filename or "upload.bc3")
 
-        presupuesto = PresupuestoBC3()
-        presupuesto.metadata["encoding"] = encoding
-        presupuesto.metadata["filepath"] = filename or "upload.bc3"
+    def parse_from_stream(self, fh: BinaryIO, filename: str = "") -> PresupuestoBC3:
+        """
+        Parsea contenido BC3 desde un stream binario (uploads web sin copia previa).
 
-        return self._parse_content(contenido, presupuesto)
+        El stream se decodifica y procesa por bloques, registro a registro, sin
+        cargar el archivo completo en memoria.
+
+        Args:
+            fh: Objeto tipo archivo binario posicionado al inicio del BC3
+            filename: Nombre del archivo (opcional)
+
+        Returns:
+            PresupuestoBC3 con todos los datos parseados
+        """
+        return self._parse_stream(fh, filename or "upload.bc3")
 
     def parse(self, filepath: str) -> PresupuestoBC3:
         """
@@ -110,10 +241,105 @@ class BC3Parser:
             PresupuestoBC3 con todos los datos parseados
         """
         with open(filepath, "rb") as f:
-            raw = f.read()
+            return self._parse_stream(f, filepath)
+
+    def _parse_stream(self, fh: BinaryIO, filepath: str) -> PresupuestoBC3:
+        """
+        Parseo incremental con la misma detección que _decodificar: se intenta
+        UTF-8 y, si aparece un byte inválido, se rebobina y se parsea como latin-1.
+        """
+        if self.procesos > 1:
+            # El reparto entre procesos necesita todos los registros a la vez
+            return self._parse_content_bytes(fh.read(), filepath)
+        try:
+            inicio = fh.tell()
+        except (AttributeError, OSError):
+            # Sin posición (no se puede rebobinar): parseo en memoria
+            return self._parse_content_bytes(fh.read(), filepath)
+        # Un único plazo para el intento UTF-8 y el reintento latin-1
+        limite = time.monotonic() + self.timeout if self.timeout else None
+        presupuesto = self._parse_stream_como(fh, filepath, "utf-8", limite)
+        if presupuesto is None:
+            fh.seek(inicio)
+            presupuesto = self._parse_stream_como(fh, filepath, "latin-1", limite)
+        return presupuesto
+
+    def _parse_stream_como(
+        self, fh: BinaryIO, filepath: str, encoding: str, limite: Optional[float]
+    ) -> Optional[PresupuestoBC3]:
+        """
+        Parsea el stream con la codificación dada. None si no es UTF-8 válido.
+
+        Cada bloque se recorre una sola vez: un registro que ocupa varios
+        bloques se acumula por trozos y se une al llegar su ~ (coste lineal).
+        """
+        presupuesto = PresupuestoBC3()
+        presupuesto.metadata["encoding"] = encoding
+        presupuesto.metadata["filepath"] = filepath
+
+        decoder = codecs.getincrementaldecoder(encoding)()
+        trozos = []  # registro incompleto tras el último ~ leído
+        fin_datos = False  # tras el EOF (ASCII-26) solo se valida la codificación
+        i = 0
+
+        while True:
+            bloque = fh.read(self.STREAM_CHUNK_SIZE)
+            try:
+                texto = decoder.decode(bloque, final=not bloque)
+            except UnicodeDecodeError:
+                return None
+            if fin_datos:
+                if not bloque:
+                    return presupuesto
+                continue
+            if limite is not None and time.monotonic() > limite:
+                raise TimeoutError(f"El parseo BC3 superó {self.timeout} s")
+
+            fin = texto.find("\x1a")
+            if fin >= 0:
+                texto = texto[:fin]
+                fin_datos = True
+            ultimo = fin_datos or not bloque
+            registros_raw = texto.split("~")
+            if len(registros_raw) == 1 and not ultimo:
+                # Sin ~ en el bloque: el registro sigue en el siguiente
+                trozos.append(texto)
+                continue
+            if trozos:
+                trozos.append(registros_raw[0])
+                registros_raw[0] = "".join(trozos)
+            # El último trozo puede continuar en el bloque siguiente
+            trozos = [] if ultimo else [registros_raw.pop()]
+
+            for reg_raw in registros_raw:
+                if limite is not None and not i & 1023 and time.monotonic() > limite:
+                    raise TimeoutError(f"El parseo BC3 superó {self.timeout} s")
+                i += 1
+                self._procesar_registro(
+                    reg_raw.replace("\r\n", "\n").replace("\r", "\n"), presupuesto
+                )
 
-        encoding = self._detect_encoding(raw)
-        contenido = raw.decode(encoding, errors="replace")
+            if not bloque:
+                return presupuesto
+
+    def _parse_content_bytes(self, raw: bytes, filepath: str) -> PresupuestoBC3:
+        """
+        Detecta codificación, decodifica y parsea un contenido completo.
+
+        El EOF (ASCII-26) y los saltos de línea se tratan sobre los bytes, antes
+        de decodificar: son ASCII y nunca forman parte de un carácter UTF-8
+        multibyte, así que el resultado es el mismo que sobre el texto.
+        """
+        fin = raw.find(b"\x1a")
+        datos = raw if fin < 0 else raw[:fin]
+        datos = datos.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        encoding, contenido = self._decodificar(datos)
+        if encoding == "utf-8" and fin >= 0:
+            # Como en el stream, lo que sigue al EOF también decide la codificación
+            try:
+                raw[fin:].decode("utf-8")
+            except UnicodeDecodeError:
+                encoding, contenido = "latin-1", datos.decode("latin-1")
 
         presupuesto = PresupuestoBC3()
         presupuesto.metadata["encoding"] = encoding
@@ -124,48 +350,83 @@ class BC3Parser:
     def _parse_content(
         self, contenido: str, presupuesto: PresupuestoBC3
     ) -> PresupuestoBC3:
-        """Parse interno según especificación FIEBDC-3."""
-        contenido = contenido.replace("\r\n", "\n").replace("\r", "\n")
-
-        # Eliminar carácter EOF (ASCII-26) si existe
-        if "\x1a" in contenido:
-            contenido = contenido.split("\x1a")[0]
+        """
+        Parse interno según especificación FIEBDC-3.
 
+        `contenido` llega ya cortado en el EOF y con saltos de línea normalizados.
+        """
         # Registros entre ~
         registros_raw = contenido.split("~")
+        if self.procesos > 1 and len(registros_raw) >= PARALELO_MIN_REGISTROS:
+            return self._parse_paralelo(registros_raw, presupuesto)
+        return self._parse_registros(registros_raw, presupuesto)
 
-        for reg_raw in registros_raw:
-            reg_raw = reg_raw.strip()
-            if not reg_raw:
-                continue
+    def _parse_registros(
+        self, registros_raw: List[str], presupuesto: PresupuestoBC3
+    ) -> PresupuestoBC3:
+        """Procesa una lista de registros en orden sobre `presupuesto`."""
+        # Límite de tiempo cooperativo: se comprueba cada 1024 registros
+        limite = time.monotonic() + self.timeout if self.timeout else None
 
-            campos = self._split_campos(reg_raw)
-            if not campos:
-                continue
+        for i, reg_raw in enumerate(registros_raw):
+            if limite is not None and not i & 1023 and time.monotonic() > limite:
+                raise TimeoutError(f"El parseo BC3 superó {self.timeout} s")
+            self._procesar_registro(reg_raw, presupuesto)
 
-            tipo = campos[0].strip().upper()
-
-            if tipo == "V":
-                self._parse_registro_v(campos, presupuesto)
-            elif tipo == "K":
-                self._parse_registro_k(campos, presupuesto)
-            elif tipo == "C":
-                self._parse_registro_c(campos, presupuesto)
-            elif tipo == "D":
-                self._parse_registro_d(campos, presupuesto)
-            elif tipo == "Y":
-                self._parse_registro_y(campos, presupuesto)
-            elif tipo == "M":
-                self._parse_registro_m(campos, presupuesto)
-            elif tipo == "T":
-                self._parse_registro_t(campos, presupuesto)
-            elif tipo == "R":
-                self._guardar_otro(tipo, campos, presupuesto)
-            elif tipo in ("F", "G", "L", "O", "X", "Z"):
-                self._guardar_otro(tipo, campos, presupuesto)
+        return presupuesto
 
+    def _parse_paralelo(
+        self, registros_raw: List[str], presupuesto: PresupuestoBC3
+    ) -> PresupuestoBC3:
+        """
+        Reparte los registros en tramos consecutivos, los parsea en procesos
+        separados y fusiona los parciales en orden: el resultado es el mismo
+        que procesándolos uno tras otro.
+        """
+        tam = -(-len(registros_raw) // self.procesos)
+        tramos = [registros_raw[i:i + tam] for i in range(0, len(registros_raw), tam)]
+        parciales = _pool(self.procesos).map(_parse_tramo, tramos, repeat(self.timeout))
+        for parcial, con_d in parciales:
+            self._fusionar(presupuesto, parcial, con_d)
         return presupuesto
 
+    def _fusionar(self, destino: PresupuestoBC3, parcial: PresupuestoBC3, con_d: set):
+        """
+        Añade a `destino` el parcial de un tramo posterior, con la misma
+        semántica que el parseo secuencial: el último registro gana, salvo ~Y,
+        que se suma a la descomposición previa si el tramo no trae un ~D del código.
+        """
+        if parcial.version:
+            destino.version = parcial.version
+        destino.coeficientes.update(parcial.coeficientes)
+        columnas = zip(parcial.unidades, parcial.resumenes, parcial.precios, parcial.fechas, parcial.tipos)
+        for codigo, campos in zip(parcial.indice_conceptos, columnas):
+            self._guardar_concepto(destino, codigo, *campos)
+        for codigo, lineas in parcial.descomposiciones.items():
+            previas = destino.descomposiciones.get(codigo)
+            if previas is None or codigo in con_d:
+                destino.descomposiciones[codigo] = lineas
+            else:
+                previas.extend(lineas)
+        destino.mediciones.update(parcial.mediciones)
+        destino.textos.update(parcial.textos)
+        for tipo, registros in parcial.otros_registros.items():
+            destino.otros_registros.setdefault(tipo, []).extend(registros)
+
+    def _procesar_registro(self, reg_raw: str, presupuesto: PresupuestoBC3):
+        """Procesa un registro (texto entre ~, saltos de línea ya normalizados)."""
+        reg_raw = reg_raw.strip()
+        if not reg_raw:
+            return
+
+        campos = self._split_campos(reg_raw)
+        if not campos:
+            return
+
+        manejador = self._dispatch.get(campos[0].strip().upper())
+        if manejador is not None:
+            manejador(campos, presupuesto)
+
     def _parse_registro_v(self, campos: List[str], presupuesto: PresupuestoBC3):
         """
         ~V | PROPIEDAD_ARCHIVO | VERSION_FORMATO \ DDMMAAAA | PROGRAMA_EMISION |
@@ -186,14 +447,14 @@ class BC3Parser:
                     "fecha_certificacion",
                     "url_base",
                 ],
-                (campos[1:11] if len(campos) > 11 else campos[1:] + [""] * 10),
+                _strip_todos(campos[1:11] if len(campos) > 11 else campos[1:] + [""] * 10),
             )
         )
 
     def _parse_registro_k(self, campos: List[str], presupuesto: PresupuestoBC3):
         """~K | Decimales y coeficientes. Almacenamos raw para futuras mejoras."""
         if len(campos) > 1:
-            presupuesto.coeficientes["raw"] = campos[1:]
+            presupuesto.coeficientes["raw"] = _strip_todos(campos[1:])
 
     def _parse_registro_c(self, campos: List[str], presupuesto: PresupuestoBC3):
         """
@@ -202,23 +463,58 @@ class BC3Parser:
         """
         if len(campos) < 4:
             return
-        codigo_raw = campos[1]
+        # Campos según especificación: CODIGO, UNIDAD, RESUMEN, PRECIO, FECHA, TIPO
+        # (los opcionales que faltan se rellenan con "")
+        if len(campos) < 7:
+            campos = campos + [""] * (7 - len(campos))
+        _, codigo_raw, unidad_raw, resumen_raw, precio_raw, fecha_raw, tipo_raw = campos[:7]
+
         codigo = _primer_subcampo(codigo_raw) or codigo_raw.strip()
         codigo = self._limpiar_codigo(codigo)
         if not codigo:
             return
 
-        # Campos según especificación: UNIDAD, RESUMEN, PRECIO, FECHA, TIPO
-        unidad = _primer_subcampo(campos[2]) if len(campos) > 2 else ""
-        resumen = _primer_subcampo(campos[3]) if len(campos) > 3 else ""
-        precio_raw = campos[4] if len(campos) > 4 else ""
-        precio = _primer_subcampo(precio_raw) or precio_raw.strip()
-        fecha_raw = campos[5] if len(campos) > 5 else ""
-        fecha = _primer_subcampo(fecha_raw) or fecha_raw.strip()
-        tipo = _primer_subcampo(campos[6]) if len(campos) > 6 else ""
+        self._guardar_concepto(
+            presupuesto,
+            codigo,
+            _primer_subcampo(unidad_raw),
+            _primer_subcampo(resumen_raw),
+            _primer_subcampo(precio_raw) or precio_raw.strip(),
+            _primer_subcampo(fecha_raw) or fecha_raw.strip(),
+            _primer_subcampo(tipo_raw),
+        )
 
-        # Guardamos [unidad, resumen, precio, fecha, tipo, ...] para compatibilidad
-        presupuesto.conceptos[codigo] = [unidad, resumen, precio, fecha, tipo]
+    def _guardar_concepto(
+        self,
+        presupuesto: PresupuestoBC3,
+        codigo: str,
+        unidad: str,
+        resumen: str,
+        precio: str,
+        fecha: str,
+        tipo: str,
+    ):
+        """Guarda un concepto en las listas paralelas; uno repetido reemplaza al anterior en su misma posición."""
+        # Unidad, fecha y tipo se repiten en miles de conceptos ("m2", "ud", "0"):
+        # internados comparten un único objeto por valor
+        unidad = sys.intern(unidad)
+        fecha = sys.intern(fecha)
+        tipo = sys.intern(tipo)
+
+        i = presupuesto.indice_conceptos.get(codigo)
+        if i is None:
+            presupuesto.indice_conceptos[codigo] = len(presupuesto.unidades)
+            presupuesto.unidades.append(unidad)
+            presupuesto.resumenes.append(resumen)
+            presupuesto.precios.append(precio)
+            presupuesto.fechas.append(fecha)
+            presupuesto.tipos.append(tipo)
+        else:
+            presupuesto.unidades[i] = unidad
+            presupuesto.resumenes[i] = resumen
+            presupuesto.precios[i] = precio
+            presupuesto.fechas[i] = fecha
+            presupuesto.tipos[i] = tipo
 
     def _parse_registro_d(self, campos: List[str], presupuesto: PresupuestoBC3):
         """
@@ -235,9 +531,8 @@ class BC3Parser:
             sub = _todos_subcampos(campo)
             if not sub:
                 continue
-            codigo_hijo = sub[0]
-            factor = sub[1] if len(sub) > 1 else "1"
-            rendimiento = sub[2] if len(sub) > 2 else "1"
+            # CODIGO_HIJO \ FACTOR \ RENDIMIENTO (factor y rendimiento: 1 si faltan)
+            codigo_hijo, factor, rendimiento = (sub + ["1", "1"])[:3]
             f_ok = factor and self._parse_numero(factor) != 1.0
             r_ok = rendimiento and self._parse_numero(rendimiento) != 1.0
             if r_ok:
@@ -260,9 +555,8 @@ class BC3Parser:
             sub = _todos_subcampos(campo)
             if not sub:
                 continue
-            codigo_hijo = sub[0]
-            factor = sub[1] if len(sub) > 1 else "1"
-            rendimiento = sub[2] if len(sub) > 2 else "1"
+            # CODIGO_HIJO \ FACTOR \ RENDIMIENTO (factor y rendimiento: 1 si faltan)
+            codigo_hijo, factor, rendimiento = (sub + ["1", "1"])[:3]
             f_ok = factor and self._parse_numero(factor) != 1.0
             r_ok = rendimiento and self._parse_numero(rendimiento) != 1.0
             if r_ok:
@@ -304,12 +598,16 @@ class BC3Parser:
         """Guarda registros adicionales (R, F, G, L, O, X, Z) para integridad."""
         if tipo not in presupuesto.otros_registros:
             presupuesto.otros_registros[tipo] = []
-        presupuesto.otros_registros[tipo].append(campos[1:])
+        presupuesto.otros_registros[tipo].append(_strip_todos(campos[1:]))
 
     def _split_campos(self, registro: str) -> List[str]:
-        """Divide por | según especificación FIEBDC-3."""
-        campos = re.split(r"\|", registro)
-        return [c.strip() for c in campos]
+        """
+        Divide por | según especificación FIEBDC-3.
+
+        Los campos quedan sin recortar: C, D, Y, M y T recortan lo que leen y
+        solo V, K y los registros guardados en bruto recortan todos sus campos.
+        """
+        return registro.split("|")
 
     def _limpiar_codigo(self, codigo: str) -> str:
         """Limpia código. ## = raíz, # = capítulo (FIEBDC-3)."""
@@ -335,46 +633,26 @@ class BC3Parser:
                 numeros.append(m)
         return " x ".join(numeros) if numeros else med[0]
 
-    def _parse_numero(self, s: str) -> Optional[float]:
-        """Parsea número español (coma decimal) o inglés según FIEBDC-3."""
-        if not s or not str(s).strip():
-            return None
-        s = str(s).strip().replace(" ", "")
-        s = s.replace(".", "").replace(",", ".")
-        try:
-            return float(s)
-        except ValueError:
-            return None
+    _parse_numero = staticmethod(_parse_numero)
 
     def get_partidas_con_detalles(self, presupuesto: PresupuestoBC3) -> List[Dict]:
         """
         Genera lista de partidas con todos los detalles para exportar.
         Conforme a estructura FIEBDC-3: conceptos (~C), mediciones (~M), textos (~T), descomposiciones (~D).
         """
-        partidas = []
-        codigos_procesados = set()
-
-        def orden_codigo(c: str) -> tuple:
-            """Ordenación jerárquica de códigos (##, #, 01.1.001)."""
-            base = str(c).replace("##", "").replace("#", "")
-            partes = re.split(r"[.#]", base)
-            result = []
-            for p in partes[:8]:
-                if p.isdigit():
-                    result.append(int(p))
-                else:
-                    result.append(p or "0")
-            return tuple(result)
-
-        todos_codigos = set(presupuesto.conceptos.keys()) | set(
-            presupuesto.mediciones.keys()
-        )
-        codigos_ordenados = sorted(todos_codigos, key=orden_codigo)
+        return list(self.iter_partidas_con_detalles(presupuesto))
 
-        for codigo in codigos_ordenados:
-            if codigo in codigos_procesados:
-                continue
+    def iter_partidas_con_detalles(self, presupuesto: PresupuestoBC3) -> Iterator[Dict]:
+        """
+        Igual que get_partidas_con_detalles, pero genera las partidas de una en
+        una (en orden de código) sin retener la lista completa.
+        """
+        # La unión de las vistas de claves ya es un set: cada código aparece una vez
+        indice_conceptos = presupuesto.indice_conceptos
+        todos_codigos = indice_conceptos.keys() | presupuesto.mediciones.keys()
+        codigos_ordenados = sorted(todos_codigos, key=_orden_codigo)
 
+        for codigo in codigos_ordenados:
             partida = {
                 "codigo": codigo,
                 "descripcion": "",
@@ -386,11 +664,11 @@ class BC3Parser:
                 "descomposicion": "",
             }
 
-            if codigo in presupuesto.conceptos:
-                campos = presupuesto.conceptos[codigo]
-                partida["unidad"] = campos[0] if len(campos) > 0 else ""
-                partida["descripcion"] = campos[1] if len(campos) > 1 else ""
-                partida["precio_unitario"] = campos[2] if len(campos) > 2 else ""
+            i = indice_conceptos.get(codigo)
+            if i is not None:
+                partida["unidad"] = presupuesto.unidades[i]
+                partida["descripcion"] = presupuesto.resumenes[i]
+                partida["precio_unitario"] = presupuesto.precios[i]
 
             if codigo in presupuesto.textos:
                 partida["texto_largo"] = presupuesto.textos[codigo]
@@ -417,7 +695,32 @@ class BC3Parser:
             except (ValueError, TypeError):
                 pass
 
-            partidas.append(partida)
-            codigos_procesados.add(codigo)
+            yield partida
+
+
+def _pool(procesos: int) -> ProcessPoolExecutor:
+    """Pool de procesos compartido por todos los parsers con el mismo número de procesos."""
+    with _pools_lock:
+        pool = _pools.get(procesos)
+        if pool is None:
+            pool = _pools[procesos] = ProcessPoolExecutor(max_workers=procesos)
+        return pool
+
+
+def _parse_tramo(registros_raw: List[str], timeout: Optional[float]):
+    """
+    Parsea en un proceso hijo un tramo de registros consecutivos.
+
+    Returns:
+        Tupla (PresupuestoBC3 parcial, códigos con algún ~D en el tramo)
+    """
+    parser = BC3Parser(timeout=timeout)
+    con_d = set()
+
+    def registro_d(campos: List[str], presupuesto: PresupuestoBC3):
+        parser._parse_registro_d(campos, presupuesto)
+        if len(campos) >= 3 and parser._limpiar_codigo(campos[1]):
+            con_d.add(parser._limpiar_codigo(campos[1]))
 
-        return partidas
+    parser._dispatch["D"] = registro_d
+    return parser._parse_registros(registros_raw, PresupuestoBC3()), con_d
@@ -0,0 +1,918 @@
+# -*- coding: utf-8 -*-
+"""
+BC3 Reader - Aplicación web Flask.
+
+create_app() construye la aplicación: página principal (embebida o
+public/index.html), conversión, descargas y cola de trabajos. Una única copia
+de la plantilla y de la lógica, cargada una vez por worker.
+"""
+
+import base64
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import string
+import tempfile
+import threading
+import time
+import unicodedata
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import quote
+
+from flask import Flask, request, jsonify, Response
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.wsgi import wrap_file
+
+try:
+    import orjson
+except ImportError:  # sin orjson se usa el proveedor JSON de Flask
+    orjson = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_CONTENT_LENGTH = 20 * 1024 * 1024  # 20 MB límite
+
+# Validación de uploads: extensión .bc3 (nombre base en el grupo) y formatos de salida
+_BC3_FILENAME_RE = re.compile(r'(?P<base>.*)\.bc3\Z', re.IGNORECASE | re.DOTALL)
+_VALID_FORMATS = frozenset(('pdf', 'xlsx', 'zip'))
+_FORMAT_ALIASES = {'both': 'zip'}  # Excel y PDF juntos
+
+# Cola de conversiones en segundo plano (POST /api/convert?async=1)
+JOB_TTL = 10 * 60  # segundos que se conserva el resultado de un trabajo
+MAX_JOBS = 32  # trabajos terminados que se conservan a la vez (los más antiguos salen antes)
+MAX_PENDING_JOBS = 8  # trabajos en cola o en curso; por encima se responde 503
+RETRY_AFTER = 5  # segundos sugeridos al cliente cuando la cola está llena
+DOWNLOAD_MAX_AGE = 5 * 60  # caché privada de las descargas (segundos)
+_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('BC3_WORKERS', '2')))
+_jobs = {}  # job_id -> (Future, timestamp de creación)
+_jobs_lock = threading.Lock()
+
+# Pool compartido para exportar Excel y PDF a la vez (formato zip). Con
+# BC3_EXPORT_PROCESSES=1 usa procesos y esquiva el GIL; en Vercel (un solo
+# proceso por invocación) se queda en hilos.
+if os.environ.get('BC3_EXPORT_PROCESSES') == '1':
+    _export_executor = ProcessPoolExecutor(max_workers=2)
+else:
+    _export_executor = ThreadPoolExecutor(max_workers=2)
+
+PARSE_TIMEOUT = float(os.environ.get('BC3_PARSE_TIMEOUT', '15'))  # segundos por parseo
+PARSE_PROCESSES = int(os.environ.get('BC3_PARSE_PROCESSES', '1'))  # procesos para BC3 muy grandes
+UPLOAD_SPOOL_SIZE = 2 * 1024 * 1024  # los uploads mayores se vuelcan a disco
+HASH_CHUNK_SIZE = 64 * 1024
+
+# Fuera de Vercel, servir las salidas grandes desde disco (sendfile zero-copy)
+USE_SENDFILE = os.environ.get('USE_SENDFILE') == '1'
+SENDFILE_MIN_SIZE = 1024 * 1024
+
+# Cachés LRU acotadas por número de entradas y por bytes. Las partidas se
+# miden por el tamaño del BC3 subido (en memoria ocupan unas 2-3 veces más)
+PARSE_CACHE_SIZE = 32
+PARSE_CACHE_BYTES = 32 * 1024 * 1024
+EXPORT_CACHE_SIZE = 16
+EXPORT_CACHE_BYTES = 64 * 1024 * 1024
+
+# Logo de respaldo embebido como data URI: la página no necesita otra petición
+with open(os.path.join(BASE_DIR, 'assets', 'plancraft-logo.png'), 'rb') as _f:
+    LOGO_DATA_URI = 'data:image/png;base64,' + base64.b64encode(_f.read()).decode('ascii')
+
+# HTML de la página principal - Diseño oficial Plancraft (plancraft.com/de-de)
+# Paleta: fondo #000, superficie #111, acento #00D4AA, tipografía Inter
+# Plantilla string.Template: los '$' literales del JS van escapados como '$$'
+ACCENT_COLOR = '#00D4AA'
+_INDEX_TEMPLATE = string.Template('''<!DOCTYPE html>
+<html lang="es">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>BC3 Reader | plancraft</title>
+  <link rel="preconnect" href="https://fonts.googleapis.com">
+  <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+  <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap" rel="stylesheet">
+  <style>
+    /* Plancraft design system - plancraft.com/de-de */
+    :root {
+      --plancraft-bg: #000000;
+      --plancraft-surface: #111111;
+      --plancraft-border: #262626;
+      --plancraft-text: #ffffff;
+      --plancraft-muted: #737373;
+      --plancraft-accent: ${accent};
+      --plancraft-accent-hover: #00E5B8;
+      --plancraft-success: ${accent};
+      --plancraft-error: #ef4444;
+      --radius: 8px;
+      --radius-lg: 12px;
+    }
+    * { margin: 0; padding: 0; box-sizing: border-box; }
+    body {
+      font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
+      background: var(--plancraft-bg);
+      color: var(--plancraft-text);
+      min-height: 100vh;
+      display: flex;
+      flex-direction: column;
+      align-items: center;
+      justify-content: center;
+      padding: 48px 24px;
+      line-height: 1.5;
+      -webkit-font-smoothing: antialiased;
+    }
+    .header {
+      display: flex;
+      align-items: center;
+      gap: 12px;
+      margin-bottom: 48px;
+    }
+    .header img {
+      height: 36px;
+      width: auto;
+    }
+    .header-product { font-size: 1.125rem; font-weight: 600; color: var(--plancraft-accent); margin-left: 8px; }
+    .container {
+      max-width: 680px;
+      width: 100%;
+    }
+    .cards { display: flex; flex-direction: row; gap: 24px; flex-wrap: wrap; justify-content: center; }
+    @media (max-width: 640px) { .cards { flex-direction: column; } }
+    .card {
+      background: var(--plancraft-surface);
+      border: 1px solid var(--plancraft-border);
+      border-radius: var(--radius-lg);
+      padding: 24px;
+      transition: all 0.2s ease;
+      flex: 1;
+      min-width: 280px;
+      max-width: 320px;
+    }
+    .card-title { font-size: 1rem; font-weight: 600; margin-bottom: 16px; color: var(--plancraft-text); }
+    h1 {
+      font-size: 1.75rem;
+      font-weight: 700;
+      margin-bottom: 8px;
+      color: var(--plancraft-text);
+      letter-spacing: -0.02em;
+    }
+    h1 .accent { color: var(--plancraft-accent); }
+    .subtitle {
+      color: var(--plancraft-muted);
+      font-size: 0.9375rem;
+      margin-bottom: 32px;
+      font-weight: 400;
+    }
+    .upload-zone {
+      background: var(--plancraft-surface);
+      border: 2px dashed var(--plancraft-border);
+      border-radius: var(--radius-lg);
+      padding: 40px 32px;
+      text-align: center;
+      transition: all 0.2s ease;
+      cursor: pointer;
+      position: relative;
+      margin-bottom: 24px;
+    }
+    .upload-zone:hover, .upload-zone.dragover {
+      border-color: var(--plancraft-accent);
+      background: rgba(0, 212, 170, 0.06);
+    }
+    .upload-zone input { position: absolute; inset: 0; opacity: 0; cursor: pointer; }
+    .upload-icon { font-size: 2.5rem; margin-bottom: 16px; opacity: 0.7; }
+    .upload-text { font-size: 1rem; font-weight: 500; margin-bottom: 4px; }
+    .upload-hint { font-size: 0.8125rem; color: var(--plancraft-muted); }
+    .file-name { margin-bottom: 20px; font-size: 0.875rem; color: var(--plancraft-success); display: none; }
+    .file-name.visible { display: block; }
+    .btn {
+      display: inline-flex;
+      align-items: center;
+      justify-content: center;
+      gap: 8px;
+      padding: 14px 24px;
+      font-size: 1rem;
+      font-weight: 600;
+      font-family: inherit;
+      border: none;
+      border-radius: var(--radius);
+      cursor: pointer;
+      width: 100%;
+      background: var(--plancraft-accent);
+      color: #000000;
+      transition: all 0.2s ease;
+    }
+    .btn:hover:not(:disabled) {
+      background: var(--plancraft-accent-hover);
+    }
+    .btn:disabled { opacity: 0.5; cursor: not-allowed; }
+    .btn.loading { pointer-events: none; }
+    .btn .spinner {
+      width: 20px;
+      height: 20px;
+      border: 2px solid rgba(0,0,0,0.2);
+      border-top-color: #000;
+      border-radius: 50%;
+      animation: spin 0.8s linear infinite;
+    }
+    @keyframes spin { to { transform: rotate(360deg); } }
+    .message {
+      margin-top: 24px;
+      padding: 16px;
+      border-radius: var(--radius);
+      font-size: 0.875rem;
+      display: none;
+    }
+    .message.visible { display: block; }
+    .message.error { background: rgba(239, 68, 68, 0.15); color: #f87171; }
+    .message.success { background: rgba(0, 212, 170, 0.12); color: var(--plancraft-accent-hover); }
+    .footer {
+      margin-top: 48px;
+      font-size: 0.75rem;
+      color: var(--plancraft-muted);
+      text-align: center;
+    }
+    .footer a { color: var(--plancraft-accent); text-decoration: none; }
+    .footer a:hover { text-decoration: underline; }
+    .loader-overlay {
+      position: fixed; inset: 0; background: rgba(0,0,0,0.85); z-index: 9999;
+      display: none; align-items: center; justify-content: center; flex-direction: column; gap: 20px;
+    }
+    .loader-overlay.visible { display: flex; }
+    .loader-bar-wrap { width: 280px; height: 6px; background: var(--plancraft-border); border-radius: 3px; overflow: hidden; }
+    .loader-bar { height: 100%; background: var(--plancraft-accent); width: 0%; transition: width 0.3s ease; border-radius: 3px; }
+    .loader-bar.indeterminate { width: 40%; animation: loadBar 1.5s ease-in-out infinite; }
+    @keyframes loadBar { 0% { transform: translateX(-100%); } 50% { transform: translateX(150%); } 100% { transform: translateX(-100%); } }
+    .loader-text { color: var(--plancraft-muted); font-size: 0.875rem; }
+  </style>
+</head>
+<body>
+  <div class="header">
+    <img src="https://cdn.prod.website-files.com/6721edec2a463887e742a101/6721edec2a463887e742a172_plancraft%20logo.svg" alt="plancraft" onerror="this.src='${logo_data_uri}'">
+    <span class="header-product">BC3 Reader</span>
+  </div>
+  <div class="container">
+    <h1>Convertidor <span class="accent">BC3</span></h1>
+    <p class="subtitle">Sube tu archivo BC3 (FIEBDC) y elige el formato de salida</p>
+    <div class="cards">
+      <div class="card">
+        <h3 class="card-title">BC3 → PDF</h3>
+        <form id="formPdf" class="card-form">
+          <input type="hidden" name="format" value="pdf">
+          <div class="upload-zone" id="dropZonePdf" data-format="pdf">
+            <input type="file" name="file" accept=".bc3" required>
+            <div class="upload-icon">📄</div>
+            <div class="upload-text">Arrastra tu BC3 o haz clic</div>
+            <div class="upload-hint">Archivos .bc3 (máx. 20 MB)</div>
+          </div>
+          <div class="file-name" id="fileNamePdf"></div>
+          <button type="submit" class="btn" disabled>
+            <span class="btn-text">Convertir a PDF</span>
+          </button>
+        </form>
+      </div>
+      <div class="card">
+        <h3 class="card-title">BC3 → Excel</h3>
+        <form id="formXlsx" class="card-form">
+          <input type="hidden" name="format" value="xlsx">
+          <div class="upload-zone" id="dropZoneXlsx" data-format="xlsx">
+            <input type="file" name="file" accept=".bc3" required>
+            <div class="upload-icon">📄</div>
+            <div class="upload-text">Arrastra tu BC3 o haz clic</div>
+            <div class="upload-hint">Archivos .bc3 (máx. 20 MB)</div>
+          </div>
+          <div class="file-name" id="fileNameXlsx"></div>
+          <button type="submit" class="btn" disabled>
+            <span class="btn-text">Convertir a Excel</span>
+          </button>
+        </form>
+      </div>
+    </div>
+    <div class="message" id="message"></div>
+  </div>
+  <p class="footer">Formato FIEBDC • <a href="https://plancraft.com" target="_blank" rel="noopener">plancraft.com</a></p>
+  <div class="loader-overlay" id="loaderOverlay">
+    <div class="loader-bar-wrap"><div class="loader-bar" id="loaderBar"></div></div>
+    <span class="loader-text" id="loaderText">Procesando archivo BC3...</span>
+  </div>
+  <script>
+    const message=document.getElementById('message'), overlay=document.getElementById('loaderOverlay'),
+      loaderBar=document.getElementById('loaderBar'), loaderText=document.getElementById('loaderText');
+    function showMessage(text,type){ message.textContent=text; message.className='message visible '+type; }
+    function hideMessage(){ message.className='message'; }
+    function showLoader(format){ overlay.classList.add('visible'); loaderBar.classList.add('indeterminate'); loaderBar.style.width=''; loaderText.textContent='Convirtiendo a '+(format==='pdf'?'PDF':'Excel')+'...'; }
+    function hideLoader(){ loaderBar.classList.remove('indeterminate'); loaderBar.style.width='100%'; loaderText.textContent='¡Listo!'; setTimeout(()=>{ overlay.classList.remove('visible'); loaderBar.style.width='0%'; },400); }
+    function initCard(formId,dropId,fileNameId){
+      const form=document.getElementById(formId), dropZone=document.getElementById(dropId),
+        fileNameEl=document.getElementById(fileNameId), fileInput=dropZone.querySelector('input[type="file"]'),
+        btn=form.querySelector('button'), btnText=btn.querySelector('.btn-text'), format=form.querySelector('input[name="format"]').value;
+      function setLoading(loading){
+        btn.disabled=loading;
+        btn.classList.toggle('loading',loading);
+        btnText.innerHTML=loading?'<span class="spinner"></span> Procesando...':(format==='pdf'?'Convertir a PDF':'Convertir a Excel');
+      }
+      function updateFile(files){
+        if(files&&files.length){
+          fileInput.files=files;
+          fileNameEl.textContent='✓ '+files[0].name;
+          fileNameEl.classList.add('visible');
+          btn.disabled=false;
+        }
+      }
+      dropZone.onclick=()=>fileInput.click();
+      dropZone.ondragover=e=>{ e.preventDefault(); dropZone.classList.add('dragover'); };
+      dropZone.ondragleave=()=>dropZone.classList.remove('dragover');
+      dropZone.ondrop=e=>{
+        e.preventDefault();
+        dropZone.classList.remove('dragover');
+        if(e.dataTransfer.files.length&&e.dataTransfer.files[0].name.toLowerCase().endsWith('.bc3')){
+          updateFile(e.dataTransfer.files);
+        }else{
+          showMessage('Solo se aceptan archivos .bc3','error');
+        }
+      };
+      fileInput.onchange=e=>updateFile(e.target.files);
+      form.onsubmit=async e=>{
+        e.preventDefault();
+        if(!fileInput.files.length) return;
+        setLoading(true);
+        hideMessage();
+        showLoader(format);
+        try{
+          const res=await fetch('/api/convert',{method:'POST',body:new FormData(form)});
+          if(!res.ok){
+            const err=await res.json().catch(()=>({}));
+            throw new Error(err.error||'Error '+res.status);
+          }
+          const blob=await res.blob();
+          const url=URL.createObjectURL(blob);
+          const a=document.createElement('a');
+          const ext=format==='pdf'?'pdf':'xlsx';
+          a.href=url;
+          a.download=fileInput.files[0].name.replace(/\\.bc3$$/i,'')+'.'+ext;
+          a.click();
+          URL.revokeObjectURL(url);
+          hideLoader();
+          showMessage('¡Listo! Archivo '+ext.toUpperCase()+' descargado.','success');
+        }catch(err){
+          hideLoader();
+          showMessage(err.message||'Error al procesar el archivo','error');
+        }finally{
+          setLoading(false);
+        }
+      };
+    }
+    initCard('formPdf','dropZonePdf','fileNamePdf');
+    initCard('formXlsx','dropZoneXlsx','fileNameXlsx');
+  </script>
+</body>
+</html>
+''')
+
+# Página renderizada y serializada una sola vez por worker
+INDEX_BYTES = _INDEX_TEMPLATE.substitute(logo_data_uri=LOGO_DATA_URI, accent=ACCENT_COLOR).encode('utf-8')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Proveedor JSON de Flask sobre orjson (serialización en C)."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+class ErrorConversion(Exception):
+    """Error de validación del contenido BC3 (se responde con 400)."""
+
+
+def _error_http(exc: Exception):
+    """Traduce una excepción de conversión a (mensaje, código HTTP)."""
+    if isinstance(exc, ErrorConversion):
+        return str(exc), 400
+    if isinstance(exc, TimeoutError):
+        return 'El archivo BC3 tardó demasiado en procesarse', 408
+    return f'Error al procesar: {str(exc)}', 500
+
+
+def _parece_bc3(stream) -> bool:
+    """Comprueba que el upload empiece por un registro FIEBDC (~), admitiendo BOM y espacios."""
+    cabecera = stream.read(64)
+    stream.seek(0)
+    return cabecera.lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'~')
+
+
+@lru_cache(maxsize=None)
+def _parser():
+    """
+    Parser compartido, creado en la primera conversión.
+
+    BC3Parser no guarda estado por parseo: una instancia sirve a todos los hilos.
+    """
+    from .parser import BC3Parser
+    return BC3Parser(timeout=PARSE_TIMEOUT, procesos=PARSE_PROCESSES)
+
+
+class _CacheLRU:
+    """
+    Caché LRU segura entre hilos, acotada por número de entradas y por la
+    suma de sus pesos en bytes. Una entrada de más de un cuarto del máximo
+    no se guarda: desalojaría a casi todas las demás.
+    """
+
+    def __init__(self, max_entradas: int, max_bytes: int):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()  # clave -> (valor, peso)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            self._datos.move_to_end(clave)
+            return entrada[0]
+
+    def put(self, clave, valor, peso: int):
+        if peso > self.max_bytes // 4:
+            return
+        with self._lock:
+            anterior = self._datos.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._datos[clave] = (valor, peso)
+            self._bytes += peso
+            while len(self._datos) > self.max_entradas or self._bytes > self.max_bytes:
+                _, (_, peso_viejo) = self._datos.popitem(last=False)
+                self._bytes -= peso_viejo
+
+
+_parse_cache = _CacheLRU(PARSE_CACHE_SIZE, PARSE_CACHE_BYTES)  # blake2b(content) -> (partidas, titulo)
+# (blake2b(content), 'pdf'|'xlsx') -> bytes; (etag, 'gzip') -> salida comprimida
+_export_cache = _CacheLRU(EXPORT_CACHE_SIZE, EXPORT_CACHE_BYTES)
+
+
+def _hash_contenido(stream):
+    """
+    Hash del upload calculado por bloques, sin cargarlo completo en memoria.
+
+    Returns:
+        Tupla (digest, tamaño en bytes)
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    tamano = 0
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+        hasher.update(chunk)
+        tamano += len(chunk)
+    stream.seek(0)
+    return hasher.digest(), tamano
+
+
+def _parsear(stream, filename: str, key: bytes, tamano: int):
+    """
+    Parsea el BC3 y retorna (partidas, titulo).
+
+    El resultado se cachea por hash del contenido (`key`): volver a subir el
+    mismo archivo (p. ej. PDF tras Excel) no repite el parseo.
+    """
+    cached = _parse_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    # Parsear BC3 (FIEBDC)
+    parser = _parser()
+    presupuesto = parser.parse_from_stream(stream, filename)
+    partidas = parser.get_partidas_con_detalles(presupuesto)
+    
+    if not partidas:
+        raise ErrorConversion('El archivo BC3 no contiene partidas válidas. Verifica que sea un archivo FIEBDC correcto.')
+    
+    propiedad = presupuesto.version.get('propiedad')
+    titulo = f"Presupuesto BC3 - {propiedad}" if propiedad else "Presupuesto BC3"
+    
+    _parse_cache.put(key, (partidas, titulo), tamano)
+    return partidas, titulo
+
+
+class _SumideroZip:
+    """Destino de ZipFile sin seek: acumula lo escrito hasta que se recoge."""
+
+    def __init__(self):
+        self._bloques = []
+
+    def write(self, data):
+        self._bloques.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def recoger(self) -> bytes:
+        data = b''.join(self._bloques)
+        self._bloques.clear()
+        return data
+
+
+def _zip_en_bloques(entradas):
+    """
+    Genera el ZIP entrada a entrada, sin construir el archivo completo en memoria.
+
+    Args:
+        entradas: Iterable de (nombre, bytes, compresión)
+    """
+    sumidero = _SumideroZip()
+    with zipfile.ZipFile(sumidero, 'w', zipfile.ZIP_STORED) as zf:
+        for nombre, datos, compresion in entradas:
+            zf.writestr(nombre, datos, compresion, 1)
+            yield sumidero.recoger()
+    yield sumidero.recoger()
+
+
+def _exportar(stream, filename: str, formatos: tuple) -> list:
+    """
+    Retorna los bytes de cada formato ('pdf', 'xlsx') del BC3 subido.
+
+    Las salidas se cachean por hash del contenido: reintentos, dobles clics
+    o varias pestañas con el mismo archivo no repiten parseo ni exportación.
+    Si faltan varios formatos se exportan en paralelo (no comparten estado:
+    las partidas son dicts planos).
+    """
+    from . import exporters  # cada exportador se carga al pedir su función
+
+    key, tamano = _hash_contenido(stream)
+    salidas = {}
+    for formato in formatos:
+        data = _export_cache.get((key, formato))
+        if data is not None:
+            salidas[formato] = data
+    faltan = [formato for formato in formatos if formato not in salidas]
+    if not faltan:
+        return [salidas[formato] for formato in formatos]
+
+    partidas, titulo = _parsear(stream, filename, key, tamano)
+    funciones = {'pdf': exporters.export_to_pdf_bytes, 'xlsx': exporters.export_to_xlsx_bytes}
+    if len(faltan) == 1:
+        salidas[faltan[0]] = funciones[faltan[0]](partidas, titulo)
+    else:
+        futuros = [(formato, _export_executor.submit(funciones[formato], partidas, titulo)) for formato in faltan]
+        for formato, futuro in futuros:
+            salidas[formato] = futuro.result()
+
+    for formato in faltan:
+        _export_cache.put((key, formato), salidas[formato], len(salidas[formato]))
+    return [salidas[formato] for formato in formatos]
+
+
+def _convertir(stream, filename: str, base_name: str, format_type: str, en_bloques: bool = False):
+    """
+    Pipeline CPU de conversión (parseo BC3 + exportación), sin acceso a la petición.
+
+    Separado del handler HTTP para poder ejecutarse fuera del hilo que atiende
+    la petición.
+
+    Args:
+        en_bloques: Para zip, retornar un generador de bloques en vez de bytes
+            (la respuesta se transmite mientras se empaqueta)
+
+    Returns:
+        Tupla (bytes, mimetype, nombre de descarga)
+    """
+    if format_type == 'pdf':
+        pdf_bytes, = _exportar(stream, filename, ('pdf',))
+        return pdf_bytes, 'application/pdf', f"{base_name}.pdf"
+    if format_type == 'zip':
+        xlsx_bytes, pdf_bytes = _exportar(stream, filename, ('xlsx', 'pdf'))
+        # El XLSX ya es un zip comprimido: se guarda tal cual. El PDF sí gana
+        # (~25%) y con compresslevel=1 el coste es mínimo.
+        bloques = _zip_en_bloques([
+            (f"{base_name}.xlsx", xlsx_bytes, zipfile.ZIP_STORED),
+            (f"{base_name}.pdf", pdf_bytes, zipfile.ZIP_DEFLATED),
+        ])
+        data = bloques if en_bloques else b''.join(bloques)
+        return data, 'application/zip', f"{base_name}_bc3_export.zip"
+    xlsx_bytes, = _exportar(stream, filename, ('xlsx',))
+    return (
+        xlsx_bytes,
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        f"{base_name}.xlsx"
+    )
+
+
+def _content_disposition(download_name: str) -> dict:
+    """Parámetros de Content-Disposition (RFC 5987 si el nombre no es ASCII)."""
+    try:
+        download_name.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        return {'filename': simple, 'filename*': "UTF-8''" + quote(download_name, safe="!#$&+-.^_`|~")}
+    return {'filename': download_name}
+
+
+def _cuerpo_sendfile(data: bytes):
+    """
+    Vuelca la salida a un temporal y la devuelve envuelta con el
+    wsgi.file_wrapper del servidor: gunicorn puede entregarla con sendfile(2)
+    sin copiarla por espacio de usuario. TemporaryFile ya está desvinculado
+    del disco: desaparece al cerrarse tras el envío.
+    """
+    tmp = tempfile.TemporaryFile()
+    tmp.write(data)
+    tmp.seek(0)
+    return wrap_file(request.environ, tmp)
+
+
+def _enviar_bloques(bloques, mimetype: str, download_name: str):
+    """Respuesta de descarga transmitida por bloques (sin ETag ni Content-Length)."""
+    response = Response(bloques, mimetype=mimetype)
+    response.headers.set('Content-Disposition', 'attachment', **_content_disposition(download_name))
+    response.cache_control.private = True
+    response.cache_control.max_age = DOWNLOAD_MAX_AGE
+    return response
+
+
+def _enviar_archivo(data: bytes, mimetype: str, download_name: str, generado: Optional[float] = None):
+    """
+    Respuesta de descarga con ETag del contenido y Last-Modified (304 en GET
+    condicionales); navegadores y CDN pueden reutilizarla durante 5 minutos.
+
+    Los bytes se entregan tal cual al servidor WSGI, sin copiarlos a un BytesIO
+    (o desde disco con USE_SENDFILE para salidas grandes).
+    El PDF se comprime con gzip si el cliente lo acepta (una vez por
+    contenido); XLSX y ZIP ya van comprimidos.
+    """
+    etag = hashlib.blake2b(data, digest_size=8).hexdigest()
+    gzipped = mimetype == 'application/pdf' and 'gzip' in request.accept_encodings
+    if gzipped:
+        # La versión comprimida se cachea por ETag: una segunda descarga no recomprime
+        comprimido = _export_cache.get((etag, 'gzip'))
+        if comprimido is None:
+            comprimido = gzip.compress(data, compresslevel=1)
+            _export_cache.put((etag, 'gzip'), comprimido, len(comprimido))
+        data = comprimido
+        etag = f"{etag}-gz"
+    if generado is None:
+        generado = time.time()
+    
+    # Mismas cabeceras, 304 y rangos (206) se sirva desde memoria o desde disco
+    cuerpo = _cuerpo_sendfile(data) if USE_SENDFILE and len(data) >= SENDFILE_MIN_SIZE else data
+    response = Response(cuerpo, mimetype=mimetype, direct_passthrough=True)
+    response.content_length = len(data)
+    response.headers.set('Content-Disposition', 'attachment', **_content_disposition(download_name))
+    response.set_etag(etag)
+    response.last_modified = generado
+    response = response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+    
+    if gzipped and response.status_code != 304:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = None
+    response.cache_control.private = True
+    response.cache_control.max_age = DOWNLOAD_MAX_AGE
+    return response
+
+
+def _pendientes() -> int:
+    """Trabajos en cola o en curso (llamar con _jobs_lock)."""
+    return sum(1 for future, _ in _jobs.values() if not future.done())
+
+
+def _encolar(stream, filename: str, base_name: str, format_type: str) -> Optional[str]:
+    """
+    Envía la conversión al pool de fondo y retorna el identificador del trabajo.
+
+    Returns:
+        None si ya hay MAX_PENDING_JOBS trabajos sin terminar: cada uno retiene
+        su upload y una tarea en la cola del pool.
+    """
+    with _jobs_lock:
+        if _pendientes() >= MAX_PENDING_JOBS:
+            return None
+
+    # El stream del upload se cierra al terminar la petición: copiarlo por bloques
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE)
+    shutil.copyfileobj(stream, spool, HASH_CHUNK_SIZE)
+    spool.seek(0)
+    
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        _purgar_trabajos()
+        # Otra petición pudo llenar la cola mientras se copiaba el upload
+        if _pendientes() >= MAX_PENDING_JOBS:
+            spool.close()
+            return None
+        future = _executor.submit(_convertir, spool, filename, base_name, format_type)
+        _jobs[job_id] = (future, time.time())
+    future.add_done_callback(lambda _: spool.close())
+    return job_id
+
+
+def _purgar_trabajos():
+    """
+    Acota la memoria de los trabajos (llamar con _jobs_lock): descarta los que
+    superan JOB_TTL y, por encima de MAX_JOBS, los terminados más antiguos.
+    """
+    limite = time.time() - JOB_TTL
+    for jid in [j for j, (_, creado) in _jobs.items() if creado < limite]:
+        del _jobs[jid]
+    sobrantes = len(_jobs) - MAX_JOBS
+    if sobrantes > 0:
+        # _jobs conserva el orden de creación
+        terminados = [j for j, (future, _) in _jobs.items() if future.done()]
+        for jid in terminados[:sobrantes]:
+            del _jobs[jid]
+
+
+def _estado_trabajo(future):
+    """Retorna (estado, excepción) de un trabajo: pending, done o error."""
+    if not future.done():
+        return 'pending', None
+    exc = future.exception()
+    return ('done', None) if exc is None else ('error', exc)
+
+
+def _respuesta_index(etag: str, body=None, gzipped: bool = False) -> Response:
+    """Construye una variante de la página principal (sin cuerpo: 304)."""
+    headers = {'Cache-Control': 'public, max-age=3600', 'Vary': 'Accept-Encoding'}
+    if body is None:
+        response = Response(status=304, headers=headers)
+    else:
+        if gzipped:
+            headers['Content-Encoding'] = 'gzip'
+        response = Response(body, content_type='text/html; charset=utf-8', headers=headers)
+    # ETag débil: identidad y gzip son la misma representación semántica
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def _vista_index(html: bytes):
+    """
+    Vista de la página principal con sus respuestas precalculadas (plana, gzip
+    y 304), compartidas entre peticiones: no modificar sus cabeceras.
+    """
+    etag = hashlib.blake2b(html, digest_size=8).hexdigest()
+    plain = _respuesta_index(etag, html)
+    gzipped = _respuesta_index(etag, gzip.compress(html, compresslevel=9, mtime=0), gzipped=True)
+    not_modified = _respuesta_index(etag)
+
+    def index():
+        """Sirve la página principal, gzip si el cliente lo acepta."""
+        if request.if_none_match.contains_weak(etag):
+            return not_modified
+        if 'gzip' in request.accept_encodings:
+            return gzipped
+        return plain
+
+    return index
+
+
+def _filtrar_convert():
+    """
+    Rechaza los POST a /api/convert que no pueden traer un BC3 antes de que
+    Werkzeug lea y parsee el cuerpo multipart (sin spool ni parseo inútil).
+    """
+    if request.endpoint != 'convert':
+        return None
+    if request.content_length is not None and request.content_length > MAX_CONTENT_LENGTH:
+        return jsonify({'error': 'El archivo supera el límite de 20 MB'}), 413
+    if request.mimetype != 'multipart/form-data':
+        return jsonify({'error': 'No se envió ningún archivo'}), 400
+    return None
+
+
+def convert():
+    """
+    Recibe un archivo BC3 y format (pdf|xlsx|zip|both, en el formulario o en la
+    query string). Retorna el archivo convertido (zip/both: Excel y PDF juntos);
+    con un solo formato no se genera el otro.
+    """
+    if 'file' not in request.files:
+        return jsonify({'error': 'No se envió ningún archivo'}), 400
+    
+    format_type = (request.form.get('format') or request.args.get('format') or 'xlsx').lower()
+    format_type = _FORMAT_ALIASES.get(format_type, format_type)
+    if format_type not in _VALID_FORMATS:
+        return jsonify({'error': 'Formato inválido. Usa pdf, xlsx o zip'}), 400
+    
+    file = request.files['file']
+    
+    if file.filename == '':
+        return jsonify({'error': 'No se seleccionó ningún archivo'}), 400
+    
+    match = _BC3_FILENAME_RE.match(file.filename)
+    if not match:
+        return jsonify({'error': 'El archivo debe tener extensión .bc3'}), 400
+    base_name = match.group('base')
+    
+    if not _parece_bc3(file.stream):
+        return jsonify({'error': 'El archivo no parece un BC3 (FIEBDC): no comienza con un registro ~'}), 400
+    
+    if request.args.get('async') == '1':
+        job_id = _encolar(file.stream, file.filename, base_name, format_type)
+        if job_id is None:
+            response = jsonify({'error': 'Demasiadas conversiones en curso. Inténtalo de nuevo en unos segundos.'})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(RETRY_AFTER)
+            return response
+        return jsonify({
+            'job_id': job_id,
+            'status_url': f'/api/status/{job_id}',
+            'result_url': f'/api/result/{job_id}'
+        }), 202
+    
+    # El zip se transmite mientras se empaqueta: un POST no admite 304 ni Range
+    en_bloques = format_type == 'zip'
+    try:
+        data, mimetype, download_name = _convertir(
+            file.stream, file.filename, base_name, format_type, en_bloques=en_bloques
+        )
+    except Exception as e:
+        mensaje, codigo = _error_http(e)
+        return jsonify({'error': mensaje}), codigo
+    
+    if en_bloques:
+        return _enviar_bloques(data, mimetype, download_name)
+    return _enviar_archivo(data, mimetype, download_name)
+
+
+def status(job_id):
+    """Estado de un trabajo encolado con POST /api/convert?async=1."""
+    with _jobs_lock:
+        _purgar_trabajos()
+        job = _jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    state, exc = _estado_trabajo(job[0])
+    body = {'state': state}
+    if exc is not None:
+        body['error'] = _error_http(exc)[0]
+    return jsonify(body)
+
+
+def result(job_id):
+    """
+    Descarga el resultado de un trabajo terminado.
+
+    El resultado se conserva hasta JOB_TTL (o hasta que lo desplacen MAX_JOBS
+    trabajos más recientes) para que las descargas repetidas puedan
+    resolverse con 304.
+    """
+    with _jobs_lock:
+        _purgar_trabajos()
+        job = _jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    state, exc = _estado_trabajo(job[0])
+    if state == 'pending':
+        return jsonify({'state': state}), 202
+    if state == 'error':
+        mensaje, codigo = _error_http(exc)
+        return jsonify({'error': mensaje}), codigo
+    
+    data, mimetype, download_name = job[0].result()
+    return _enviar_archivo(data, mimetype, download_name, generado=job[1])
+
+
+# Respuesta estática compartida entre peticiones (no modificar sus cabeceras)
+_HEALTH_RESPONSE = Response(b'{"status":"ok"}\n', mimetype='application/json')
+
+
+def health():
+    """Health check para Vercel (sin serializar JSON en cada sondeo)."""
+    return _HEALTH_RESPONSE
+
+
+def create_app(embed_html: bool = True) -> Flask:
+    """
+    Crea la aplicación Flask con todas las rutas.
+
+    Args:
+        embed_html: Servir la página embebida (Vercel). Con False se sirve
+            public/index.html.
+
+    Returns:
+        Aplicación Flask
+    """
+    app = Flask(__name__, static_folder=None)
+    app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+    if embed_html:
+        html = INDEX_BYTES
+    else:
+        with open(os.path.join(BASE_DIR, 'public', 'index.html'), 'rb') as f:
+            html = f.read()
+    app.add_url_rule('/', 'index', _vista_index(html))
+    app.add_url_rule('/api/convert', view_func=convert, methods=['POST'])
+    app.before_request(_filtrar_convert)
+    app.add_url_rule('/api/status/<job_id>', view_func=status)
+    app.add_url_rule('/api/result/<job_id>', view_func=result)
+    app.add_url_rule('/api/health', view_func=health, methods=['GET', 'HEAD'])
+    return app
@@ -94,9 +94,8 @@ Ejemplos:
         presupuesto = bc3_parser.parse(str(archivo))
         partidas = bc3_parser.get_partidas_con_detalles(presupuesto)
         
-        titulo = args.titulo
-        if presupuesto.version.get('empresa'):
-            titulo = f"{titulo} - {presupuesto.version['empresa']}"
+        empresa = presupuesto.version.get('empresa')
+        titulo = f"{args.titulo} - {empresa}" if empresa else args.titulo
         
         # Exportar
         for path in salidas_xlsx:
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Equivalencia entre parse_from_stream (por bloques) y parse_from_bytes."""
+
+import io
+import unittest
+from pathlib import Path
+
+from bc3_reader.parser import BC3Parser
+
+EJEMPLO = Path(__file__).resolve().parent.parent / "ejemplo.bc3"
+
+CASOS = {
+    "crlf": b"~V|prop|\r\n~C|1|m|tex\r\nto|12|\r\n~T|1|linea1\r\nlinea2\rlinea3|\r\n",
+    "tras_eof_invalido": "~V|año|\n~C|1|m|ñ|1|\n\x1a".encode("utf-8") + b"\xff\xfe basura",
+    "tras_eof_valido": "~V|año|\n~C|1|m|ñ|1|\n\x1a~C|2|m|x|1|".encode("utf-8"),
+    "latin1_al_final": "~V|año|\n~C|1|m|ñ|1|\n".encode("utf-8") + b"~T|1|\xe9|",
+    "utf8_truncado": "~V|año|\n~C|1|m|ñ|1|".encode("utf-8") + b"\xc3",
+    "registro_largo": b"~C|1|m|r|1|\n~T|1|" + b"texto " * 30000 + b"|\n~M|1|5|",
+    "sin_tilde": b"solo texto",
+    "vacio": b"",
+    "tildes_seguidas": b"~~~~V|a|~~~C|1|u|r|2|~~",
+}
+TAMANOS_BLOQUE = (1, 2, 3, 7, 64, 1000, 65536)
+
+
+def _volcado(presupuesto):
+    return (
+        presupuesto.version,
+        presupuesto.coeficientes,
+        dict(presupuesto.conceptos),
+        presupuesto.descomposiciones,
+        presupuesto.mediciones,
+        presupuesto.textos,
+        presupuesto.otros_registros,
+        presupuesto.metadata,
+    )
+
+
+class _SinSeek(io.RawIOBase):
+    """Stream de solo lectura sin tell/seek (p. ej. un socket)."""
+
+    def __init__(self, datos: bytes):
+        self._datos = io.BytesIO(datos)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._datos.readinto(b)
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        raise OSError("sin posición")
+
+
+class TestParseStream(unittest.TestCase):
+    def setUp(self):
+        self.casos = dict(CASOS, ejemplo=EJEMPLO.read_bytes())
+
+    def test_igual_que_bytes_con_cualquier_bloque(self):
+        for nombre, raw in self.casos.items():
+            esperado = _volcado(BC3Parser().parse_from_bytes(raw, nombre))
+            for tam in TAMANOS_BLOQUE:
+                if tam < 64 and len(raw) > 20000:
+                    continue
+                parser = BC3Parser()
+                parser.STREAM_CHUNK_SIZE = tam
+                with self.subTest(caso=nombre, bloque=tam):
+                    obtenido = _volcado(parser.parse_from_stream(io.BytesIO(raw), nombre))
+                    self.assertEqual(obtenido, esperado)
+
+    def test_stream_sin_seek(self):
+        raw = CASOS["latin1_al_final"]
+        obtenido = BC3Parser().parse_from_stream(io.BufferedReader(_SinSeek(raw)), "x")
+        self.assertEqual(_volcado(obtenido), _volcado(BC3Parser().parse_from_bytes(raw, "x")))
+
+    def test_timeout_unico_para_ambos_intentos(self):
+        # Un único registro de varios bloques con un byte latin-1 al final
+        raw = b"~T|1|" + b"a" * (4 * 1024 * 1024) + b"\xe9|"
+        parser = BC3Parser(timeout=1e-9)
+        with self.assertRaises(TimeoutError):
+            parser.parse_from_stream(io.BytesIO(raw), "x")
+
+
+if __name__ == "__main__":
+    unittest.main()